@@ -7,9 +7,15 @@ from plotly.subplots import make_subplots
 import requests
 import json
 from datetime import datetime, timedelta
+from pathlib import Path
+import hashlib
+import marshal
 import warnings
 warnings.filterwarnings('ignore')
 
+from fx import BASE_CURRENCY, from_base_currency, load_fx_rates
+from sketches import SketchStore
+
 # 修复sklearn导入问题
 try:
     from sklearn.linear_model import LinearRegression
@@ -71,6 +77,24 @@ analysis_type = st.sidebar.selectbox(
     ["业务概览", "交易平台渗透", "行业规模分析"]
 )
 
+# 展示币种：汇总数据均以美元口径存储，切换币种时按报告期末汇率换算（名称, 符号）
+DISPLAY_CURRENCIES = {
+    'USD': ('美元', '$'),
+    'CNY': ('人民币', '¥'),
+    'EUR': ('欧元', '€'),
+    'GBP': ('英镑', '£'),
+    'JPY': ('日元', '¥'),
+    'SGD': ('新加坡元', 'S$'),
+}
+display_currency = st.sidebar.selectbox(
+    "💱 展示币种",
+    list(DISPLAY_CURRENCIES),
+    format_func=lambda c: f"{c} · {DISPLAY_CURRENCIES[c][0]}"
+)
+currency_name, currency_symbol = DISPLAY_CURRENCIES[display_currency]
+if display_currency != 'USD':
+    st.sidebar.caption("金额按各数据报告期末汇率由美元换算")
+
 # 数据源信息
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📋 数据来源")
@@ -82,13 +106,51 @@ st.sidebar.markdown("""
 - **虚构数据**: 根据公开信息和行业报告虚构的数据
 """)
 
+# 派生数据集依赖图：每个数据集注册为一个节点（名称 + 依赖），
+# 页面按名称取数时才递归求值其依赖，结果经 st.cache_data 按 (节点名, 版本) 缓存。
+# 版本取节点及其全部上游函数的字节码哈希，修改任一加载函数后相关缓存随之失效。
+_DATASET_NODES = {}
+
+
+def dataset(name, deps=()):
+    """注册数据集节点；被装饰函数按 deps 顺序接收依赖节点的结果"""
+    def register(fn):
+        _DATASET_NODES[name] = (fn, tuple(deps))
+        return fn
+    return register
+
+
+def _node_version(name):
+    """节点版本：自身与全部上游函数代码对象的哈希"""
+    fn, deps = _DATASET_NODES[name]
+    digest = hashlib.sha1(marshal.dumps(fn.__code__))
+    for dep in deps:
+        digest.update(_node_version(dep).encode())
+    return digest.hexdigest()
+
+
+@st.cache_data(show_spinner=False)
+def _evaluate_dataset(name, version):
+    """求值单个节点（依赖同样经缓存求值，每个节点至多计算一次）"""
+    fn, deps = _DATASET_NODES[name]
+    return fn(*[_evaluate_dataset(dep, _node_version(dep)) for dep in deps])
+
+
+def get_dataset(*names, currency=BASE_CURRENCY):
+    """按名称惰性获取数据集；传入多个名称时返回元组。currency 非美元时金额列换算为该币种"""
+    nodes = [
+        _currency_node_name(name, currency) if currency != BASE_CURRENCY and name in MONEY_COLUMNS else name
+        for name in names
+    ]
+    values = tuple(_evaluate_dataset(node, _node_version(node)) for node in nodes)
+    return values[0] if len(names) == 1 else values
+
+
 # 模拟真实数据（基于公开信息）
-@st.cache_data
-def load_antom_data():
-    """加载Antom相关数据"""
-    
-    # 全球业务概览数据（2025年上半年，示例）
-    global_overview = {
+@dataset('global_overview')
+def load_global_overview():
+    """全球业务概览数据（2025年上半年，示例）"""
+    return {
         'total_merchants': 125000000,  # 1.25亿商户
         'total_consumers': 1850000000,  # 18.5亿消费者
         'countries_covered': 50,  # 50+国家
@@ -96,18 +158,24 @@ def load_antom_data():
         'monthly_transactions': 2800000000,  # 月交易量（示例）
         'total_volume_2025H1': 780000000000  # 2025年上半年总交易额（美元）
     }
-    
-    # 地区市场数据（2025 H1，示例）
-    regional_data = pd.DataFrame({
+
+
+@dataset('regional_data')
+def load_regional_data():
+    """地区市场数据（2025 H1，示例）"""
+    return pd.DataFrame({
         'region': ['亚太', '欧洲', '北美', '拉美', '中东非洲', '其他'],
         'merchants_millions': [50, 27, 22, 17, 12, 6],
         'consumers_millions': [860, 420, 320, 230, 120, 55],
         'transaction_volume_billions': [650, 320, 270, 170, 115, 60],
         'growth_rate': [14.5, 11.2, 7.9, 20.8, 17.1, 9.4]
     })
-    
-    # 国家级别的数据（用于地图可视化，含增长率）
-    country_data = pd.DataFrame({
+
+
+@dataset('country_data')
+def load_country_data():
+    """国家级别的数据（用于地图可视化，含增长率）"""
+    return pd.DataFrame({
         'iso_alpha': ['CHN', 'USA', 'JPN', 'GBR', 'DEU', 'FRA', 'IND', 'SGP', 'THA', 'IDN', 
                       'MYS', 'PHL', 'VNM', 'KOR', 'AUS', 'BRA', 'MEX', 'ARE', 'ZAF', 'CAN'],
         'country': ['中国', '美国', '日本', '英国', '德国', '法国', '印度', '新加坡', '泰国', '印尼',
@@ -118,25 +186,34 @@ def load_antom_data():
         'region': ['亚太', '北美', '亚太', '欧洲', '欧洲', '欧洲', '亚太', '亚太', '亚太', '亚太',
                    '亚太', '亚太', '亚太', '亚太', '亚太', '拉美', '拉美', '中东非洲', '中东非洲', '北美']
     })
-    
-    # 支付方式数据（2025 H1，示例）
-    payment_methods = pd.DataFrame({
+
+
+@dataset('payment_methods')
+def load_payment_methods():
+    """支付方式数据（2025 H1，示例）"""
+    return pd.DataFrame({
         'method': ['银行卡', '电子钱包', '网银转账', '数字银行', 'BNPL', '加密货币', '其他'],
         'usage_percentage': [34.1, 30.2, 17.6, 9.5, 5.4, 1.9, 1.3],
         'transaction_volume': [455, 385, 235, 118, 65, 25, 17],
         'growth_rate': [7.9, 22.6, 4.8, 38.2, 95.4, 9.6, 2.0]
     })
-    
-    # 商户行业分布
-    merchant_industries = pd.DataFrame({
+
+
+@dataset('merchant_industries')
+def load_merchant_industries():
+    """商户行业分布"""
+    return pd.DataFrame({
         'industry': ['电商零售', '餐饮酒店', '旅游出行', '金融服务', '教育培训', '医疗健康', '游戏娱乐', '其他'],
         'merchant_count': [25000000, 18000000, 15000000, 12000000, 8000000, 7000000, 5000000, 10000000],
         'avg_transaction': [85, 45, 120, 200, 35, 90, 25, 60],
         'monthly_volume': [2125000000, 810000000, 1800000000, 2400000000, 280000000, 630000000, 125000000, 600000000]
     })
 
-    # 平台覆盖与渗透（示例）
-    platform_penetration = pd.DataFrame({
+
+@dataset('platform_penetration')
+def load_platform_penetration():
+    """平台覆盖与渗透（示例）"""
+    return pd.DataFrame({
         'platform': ['AliExpress', 'Lazada', 'TikTok Shop', 'Temu', 'Shopee', 'Amazon Global', 'Daraz', 'Trendyol', 'Noon', 'MercadoLibre', 'Flipkart', 'eBay Global'],
         'region': ['全球', '东南亚', '全球', '全球', '东南亚', '全球', '南亚', '欧洲/中东', '中东', '拉美', '印度', '全球'],
         'onboard_date': ['2015-03', '2016-07', '2022-05', '2023-09', '2017-01', '2019-04', '2018-06', '2020-02', '2019-11', '2017-08', '2019-03', '2018-01'],
@@ -147,16 +224,22 @@ def load_antom_data():
         'compliance_risk': ['低', '中', '中', '中', '中', '低', '中', '中', '中', '中高', '中', '低']
     })
 
-    # 竞对分析（示例）
-    competitor_data = pd.DataFrame({
+
+@dataset('competitor_data')
+def load_competitor_data():
+    """竞对分析（示例）"""
+    return pd.DataFrame({
         'region': ['亚太', '欧洲', '北美', '拉美', '中东非', '全球'],
         'platform': ['Shopee/Lazada', 'Amazon/EU PSPs', 'Stripe/Adyen', 'MercadoPago', 'Noon/Local PSPs', 'TikTok Shop/Temu'],
         'main_competitors': ['Stripe, Adyen, Xendit', 'Adyen, Worldline, Checkout.com', 'Stripe, Adyen, PayPal Braintree', 'dLocal, EBANX', 'Checkout.com, Tap, HyperPay', 'Stripe, Adyen, PayPal'],
         'antom_strength': ['本地钱包覆盖深、费率优势', '多币种结算与风控联动', '大促稳定性与风控', '本地化钱包/分期', '监管沟通与本地方案', '平台深度合作与路由优化'],
         'antom_gap': ['中小商户触达', '部分国家合规牌照', '长尾行业拓展', '清结算时效', '风控数据本地化', '个别支付方式深度']
     })
-    
-    # 时间序列数据（截至2025年6月）
+
+
+@dataset('time_series_data')
+def load_time_series_data():
+    """时间序列数据（截至2025年6月）"""
     np.random.seed(42)  # 固定随机种子，确保数据一致性
     dates = pd.date_range(start='2023-01-01', end='2025-06-30', freq='M')
     
@@ -167,21 +250,286 @@ def load_antom_data():
     noise = np.random.normal(0, 0.05, len(dates))
     transaction_volume = base_volume * (1 + growth_trend + seasonal + noise)
     
-    time_series_data = pd.DataFrame({
+    return pd.DataFrame({
         'date': dates,
         'transaction_volume': transaction_volume,
         'merchant_count': 50 + np.linspace(0, 20, len(dates)) + np.random.normal(0, 2, len(dates)),
         'fraud_rate': 0.15 + np.linspace(0, -0.05, len(dates)) + np.random.normal(0, 0.01, len(dates)),
         'customer_satisfaction': 4.2 + np.linspace(0, 0.2, len(dates)) + np.random.normal(0, 0.05, len(dates))
     })
-    
-    return global_overview, regional_data, payment_methods, merchant_industries, time_series_data, country_data, platform_penetration, competitor_data
 
-# 加载数据
-global_overview, regional_data, payment_methods, merchant_industries, time_series_data, country_data, platform_penetration, competitor_data = load_antom_data()
+
+@dataset('industry_region_scores', deps=('merchant_industries',))
+def build_industry_region_scores(merchant_industries):
+    """行业×区域×服务商评分矩阵（0-10，报告+演示补齐）"""
+    # 去掉“其他”后的已覆盖行业，决定 Antom 的基准分
+    covered_industries = [i for i in merchant_industries['industry'].tolist() if i != '其他']
+    # 精选六个行业用于对比
+    industries_all = ['电商零售', '餐饮酒店', '旅游出行', '金融服务', '教育培训', '医疗健康']
+    regions = ['亚太', '欧洲', '北美', '拉美', '中东非洲']
+    providers4 = ['Antom', 'Stripe', 'Adyen', '本地PSP']
+    # 区域偏置，保证区分度
+    region_bias = {'亚太': 0.5, '欧洲': 0.2, '北美': 0.3, '拉美': 0.1, '中东非洲': 0.0}
+
+    np.random.seed(42)
+    # 跳过已删除的“行业强项·热力图”曾消耗的 4×6 个随机数，保持评分与旧版一致
+    np.random.uniform(-0.6, 0.6, 4 * len(industries_all))
+
+    # 多级分类x轴：上层行业、下层区域
+    x_top_level = [ind for ind in industries_all for _ in regions]
+    x_second_level = [reg for _ in industries_all for reg in regions]
+
+    # 生成 Z: [服务商 × (行业×区域)]
+    z_matrix = []
+    for prov in providers4:
+        row_vals = []
+        for ind in industries_all:
+            for reg in regions:
+                if prov == 'Antom':
+                    base = 8 if ind in covered_industries else 5
+                elif prov == 'Stripe':
+                    base = 7 if reg in ['北美', '欧洲'] else 5.5
+                elif prov == 'Adyen':
+                    base = 7.5 if reg == '欧洲' else 6.0
+                else:  # 本地PSP
+                    base = 7.0 if ind in ['餐饮酒店','本地生活','教育培训','医疗健康','游戏娱乐'] else 5.5
+                row_vals.append(max(0, min(10, round(base + region_bias.get(reg, 0.0) + np.random.uniform(-0.5, 0.5), 1))))
+        z_matrix.append(row_vals)
+
+    return {
+        'z': z_matrix,
+        'text': [[str(v) for v in row] for row in z_matrix],
+        'x': [x_top_level, x_second_level],
+        'y': providers4
+    }
+
+
+@dataset('competitor_display', deps=('competitor_data',))
+def build_competitor_display(competitor_data):
+    """竞对对照表（附渗透建议，列名为展示用中文）"""
+    suggestions_map = {
+        'Shopee/Lazada': '阿里系/东南亚：本地钱包与分期联动；新客90天加速包；内容电商失败重试+智能路由',
+        'Amazon/EU PSPs': '全球：切入长尾跨境卖家，多币种结算与稳定性；站外支付联名营销',
+        'Stripe/Adyen': '全球独立站：差异化费控+更优路由；联动风控阈值灰度提升转化',
+        'MercadoPago': '拉美：PIX/BOLETO/分期全量覆盖；税费字段与报关映射优化，缩短结算时延',
+        'Noon/Local PSPs': '中东：对接Tap/HyperPay补齐方式；伊斯兰金融合规与数据本地化优先',
+        'TikTok Shop/Temu': '内容/低客单：小额授权与批量对账优化；风控阈值AB，保转化与安全'
+    }
+    competitor_display = competitor_data.copy()
+    competitor_display['渗透建议'] = competitor_display['platform'].map(suggestions_map).fillna('按区域定制：方式矩阵+结算效率+风控转化三要素联动')
+    competitor_display = competitor_display.rename(columns={
+        'region': '区域',
+        'platform': '平台/场景',
+        'main_competitors': '主要竞对',
+        'antom_strength': 'Antom优势',
+        'antom_gap': 'Antom差距'
+    })
+    return competitor_display
+
+
+@dataset('fx_rates')
+def load_fx_rates_table():
+    """日频汇率表（1 单位本币折合美元）"""
+    return load_fx_rates(Path(__file__).parent / 'data' / 'fx_rates.csv')
+
+
+# 各数据集的美元金额列及换算所用汇率日期（报告期末）
+MONEY_COLUMNS = {
+    'regional_data': (['transaction_volume_billions'], '2025-06-30'),
+    'country_data': (['transaction_volume_billions'], '2025-06-30'),
+    'payment_methods': (['transaction_volume'], '2025-06-30'),
+    'merchant_industries': (['avg_transaction', 'monthly_volume'], '2025-06-30'),
+    'platform_penetration': (['gmv_b'], '2024-12-31'),
+}
+
+
+def _currency_node_name(name, currency):
+    return f"{name}@{currency}"
+
+
+def _register_currency_node(name, amount_cols, as_of, currency):
+    """登记 (数据集, 币种) 换算节点，依赖原数据集与汇率表，每个组合只换算一次"""
+    @dataset(_currency_node_name(name, currency), deps=(name, 'fx_rates'))
+    def convert(df, fx_rates):
+        return from_base_currency(df, amount_cols, currency, fx_rates, as_of)
+
+
+for _name, (_amount_cols, _as_of) in MONEY_COLUMNS.items():
+    for _currency in DISPLAY_CURRENCIES:
+        if _currency != BASE_CURRENCY:
+            _register_currency_node(_name, _amount_cols, _as_of, _currency)
+
+
+# KPI 草图：离线任务按 (日期, 区域) 维护 HyperLogLog / KLL 草图并写入该文件，
+# 看板按需合并；文件不存在时 KPI 卡片回退到静态数值。
+KPI_SKETCH_PATH = Path(__file__).parent / 'data' / 'kpi_sketches.json'
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_sketch_store(path, mtime):
+    """按文件修改时间缓存草图，文件更新后自动重新加载"""
+    return SketchStore.load(path)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _sketch_kpis(mtime, window_days):
+    store = _load_sketch_store(str(KPI_SKETCH_PATH), mtime)
+    days = store.days()
+    if not days:
+        return None
+    end = days[-1]
+    start = end - timedelta(days=window_days - 1)
+    prev_end = start - timedelta(days=1)
+    prev_start = prev_end - timedelta(days=window_days - 1)
+
+    # 商户/消费者为截至期末的累计去重数，环比对比上一窗口期末的累计值
+    counts = ('merchants', 'consumers')
+    total = store.merged(end=end, names=counts)
+    total_prev = store.merged(end=prev_end, names=counts)
+    # 响应时间分位数只看窗口内的请求
+    window = store.merged(start, end, names=['response_time'])['response_time']
+    window_prev = store.merged(prev_start, prev_end, names=['response_time'])['response_time']
+    return {
+        'merchants': (total['merchants'].count(), total_prev['merchants'].count()),
+        'consumers': (total['consumers'].count(), total_prev['consumers'].count()),
+        'response_time': tuple(window.quantiles([0.5, 0.95, 0.99])),
+        'response_time_prev': tuple(window_prev.quantiles([0.5, 0.95, 0.99]))
+    }
+
+
+def load_sketch_kpis(window_days=30):
+    """合并最近 window_days 天的 KPI 草图；未部署草图文件时返回 None"""
+    if not KPI_SKETCH_PATH.exists():
+        return None
+    return _sketch_kpis(KPI_SKETCH_PATH.stat().st_mtime, window_days)
+
+
+def _pct_delta(current, previous):
+    return f"{(current / previous - 1) * 100:+.1f}%" if previous else None
+
+
+# 服务端分页表格：筛选、排序与分页均在服务端完成，浏览器只接收当前页的行，
+# 表格规模增长时传输量与前端内存保持不变。各层缓存均以节点版本为键，加载函数修改后不再返回旧表。
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _shared_dataset(name, version):
+    """进程内共享的只读数据集，翻页时不再反序列化整表"""
+    return _evaluate_dataset(name, version)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _query_positions(name, version, query, sort_by, ascending):
+    """返回数据集经筛选、排序后的行位置索引（共享只读，不复制）"""
+    df = _shared_dataset(name, version)
+    positions = np.arange(len(df))
+    if query:
+        mask = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            mask |= df[col].astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+        positions = positions[mask]
+    if sort_by:
+        keys = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = keys.sort_values(ascending=ascending, kind='mergesort').index.to_numpy()
+        positions = positions[order]
+    positions.flags.writeable = False
+    return positions
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _query_window(name, version, query, sort_by, ascending, page, page_size):
+    """取出指定页的行，同时返回命中总行数"""
+    positions = _query_positions(name, version, query, sort_by, ascending)
+    window = positions[(page - 1) * page_size:page * page_size]
+    return _shared_dataset(name, version).iloc[window], len(positions)
+
+
+def paginated_table(name, key, page_sizes=(10, 25, 50, 100)):
+    """渲染数据集节点 name 的分页表格；key 用于区分同页多个表格的控件状态"""
+    version = _node_version(name)
+    columns = _shared_dataset(name, version).columns.tolist()
+    page_key = f"{key}_page"
+
+    def reset_page():
+        # 筛选、排序或每页行数变化后结果集已不同，回到第一页
+        st.session_state[page_key] = 1
+
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        query = st.text_input("🔍 筛选", key=f"{key}_query", placeholder="任意列包含的关键词", on_change=reset_page).strip()
+    with col2:
+        sort_by = st.selectbox("排序列", ['（默认顺序）'] + columns, key=f"{key}_sort_by", on_change=reset_page)
+    with col3:
+        descending = st.checkbox("降序", key=f"{key}_desc", on_change=reset_page)
+    with col4:
+        page_size = st.selectbox("每页行数", page_sizes, key=f"{key}_page_size", on_change=reset_page)
+    sort_by = None if sort_by == '（默认顺序）' else sort_by
+
+    total = len(_query_positions(name, version, query, sort_by, not descending))
+    page_count = max(1, -(-total // page_size))
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = int(st.number_input("页码", min_value=1, max_value=page_count, step=1, key=page_key))
+
+    window, total = _query_window(name, version, query, sort_by, not descending, page, page_size)
+    st.dataframe(window, use_container_width=True, hide_index=True)
+    st.caption(f"第 {page}/{page_count} 页 · 共 {total:,} 行")
+
+
+# 地图着色指标：(列名, 标题, 悬停标签, 色阶, 悬停格式)，标题与标签中的 {unit} 替换为展示币种
+# 新增指标只需在 country_data 中补列并在此登记，缺列的指标自动跳过。
+# 下发体积：每个指标的数值列只随其按钮发送一次，首个指标另作为初始 z 多发一次；
+# 悬停只显示当前指标（%{z}），customdata 仅含区域列
+MAP_METRICS = [
+    ('transaction_volume_billions', '交易量分布（十亿{unit}）', '交易量（十亿{unit}）', 'Blues', ':,.0f'),
+    ('growth_rate', '增长率分布（%）', '增长率（%）', 'RdYlGn', ':.1f'),
+]
+
+
+def metric_choropleth(df, metrics=MAP_METRICS, unit='美元'):
+    """单个地图承载全部指标：地理与区域数据只下发一次，着色指标在浏览器端切换"""
+    metrics = [
+        (col, title.format(unit=unit), label.format(unit=unit), scale, fmt)
+        for col, title, label, scale, fmt in metrics if col in df.columns
+    ]
+    def hovertemplate(label, fmt):
+        return f"<b>%{{text}}</b><br>区域: %{{customdata}}<br>{label}: %{{z{fmt}}}<extra></extra>"
+
+    col, title, label, scale, fmt = metrics[0]
+    fig = go.Figure(go.Choropleth(
+        locations=df['iso_alpha'],
+        z=df[col],
+        text=df['country'],
+        customdata=df['region'],
+        hovertemplate=hovertemplate(label, fmt),
+        colorscale=scale,
+        colorbar=dict(title=label)
+    ))
+    # 每个按钮只携带该指标的一列数值、色阶与悬停模板
+    buttons = [
+        dict(
+            label=label,
+            method='update',
+            args=[
+                {'z': [df[col]], 'colorscale': [scale], 'colorbar.title.text': label,
+                 'hovertemplate': [hovertemplate(label, fmt)]},
+                {'title.text': title}
+            ]
+        )
+        for col, title, label, scale, fmt in metrics
+    ]
+    fig.update_layout(
+        title=title,
+        height=620,
+        geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth', bgcolor='rgba(0,0,0,0)'),
+        margin=dict(l=0, r=0, t=90, b=0),
+        updatemenus=[dict(type='buttons', direction='right', buttons=buttons, x=0, xanchor='left', y=1.08, yanchor='bottom')]
+    )
+    return fig
+
 
 # 根据选择的分析类型显示不同内容
 if analysis_type == "业务概览":
+    global_overview, country_data = get_dataset('global_overview', 'country_data', currency=display_currency)
+    kpis = load_sketch_kpis()
     st.markdown('<div class="section-header">🌍 To B跨境收单业务概览</div>', unsafe_allow_html=True)
     # st.info("💡 **Antom定位**: Antom是蚂蚁国际专门为阿里国际出海电商（如AliExpress、Lazada等）商家提供的To B跨境收单服务平台。在Antom推出前，商家需要对接多个支付服务商；现在可通过Antom一站式接入300+支付方式，覆盖200+国家。")
     
@@ -196,18 +544,34 @@ if analysis_type == "业务概览":
         )
     
     with col2:
-        st.metric(
-            label="🏪 商户数量",
-            value=f"{global_overview['total_merchants']/1_000_000:.1f}M",
-            delta="+12.5%"
-        )
+        if kpis:
+            merchants, merchants_prev = kpis['merchants']
+            st.metric(
+                label="🏪 商户数量",
+                value=f"{merchants/1_000_000:.1f}M",
+                delta=_pct_delta(merchants, merchants_prev)
+            )
+        else:
+            st.metric(
+                label="🏪 商户数量",
+                value=f"{global_overview['total_merchants']/1_000_000:.1f}M",
+                delta="+12.5%"
+            )
     
     with col3:
-        st.metric(
-            label="👥 消费者",
-            value=f"{global_overview['total_consumers']/1_000_000:.1f}M",
-            delta="+8.3%"
-        )
+        if kpis:
+            consumers, consumers_prev = kpis['consumers']
+            st.metric(
+                label="👥 消费者",
+                value=f"{consumers/1_000_000:.1f}M",
+                delta=_pct_delta(consumers, consumers_prev)
+            )
+        else:
+            st.metric(
+                label="👥 消费者",
+                value=f"{global_overview['total_consumers']/1_000_000:.1f}M",
+                delta="+8.3%"
+            )
     
     with col4:
         st.metric(
@@ -215,54 +579,31 @@ if analysis_type == "业务概览":
             value=f"{global_overview['platforms_covered']}+",
             delta="新增2个平台"
         )
+
+    # 响应时间分位数（近30天，来自 KPI 草图）
+    if kpis:
+        for col, label, now, prev in zip(
+            st.columns(4),
+            ['⚡ 响应时间P50', '⚡ 响应时间P95', '⚡ 响应时间P99'],
+            kpis['response_time'],
+            kpis['response_time_prev']
+        ):
+            with col:
+                st.metric(
+                    label=label,
+                    value=f"{now:.2f}s",
+                    delta=None if np.isnan(prev) else f"{now - prev:+.2f}s",
+                    delta_color="inverse",
+                    help="近30天，对比前30天"
+                )
     
-    # 全球业务分布地图（上下排列：交易量在上，增长率在下）
+    # 全球业务分布地图（单图，按钮切换着色指标）
     st.markdown("### 🗺️ 全球业务分布")
-    fig_vol = px.choropleth(
-        country_data,
-        locations="iso_alpha",
-        color="transaction_volume_billions",
-        hover_name="country",
-        hover_data={
-            "region": True,
-            "transaction_volume_billions": ":,.0f",
-            "growth_rate": ":.1f"
-        },
-        title="交易量分布（十亿美元）",
-        color_continuous_scale="Blues",
-        projection="natural earth"
-    )
-    fig_vol.update_layout(
-        height=620,
-        geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth', bgcolor='rgba(0,0,0,0)'),
-        margin=dict(l=0, r=0, t=50, b=0)
-    )
-    # 移除所有自定义标注
-    st.plotly_chart(fig_vol, use_container_width=True)
-
-    fig_g = px.choropleth(
-        country_data,
-        locations="iso_alpha",
-        color="growth_rate",
-        hover_name="country",
-        hover_data={
-            "region": True,
-            "transaction_volume_billions": ":,.0f",
-            "growth_rate": ":.1f"
-        },
-        title="增长率分布（%）",
-        color_continuous_scale="RdYlGn",
-        projection="natural earth"
-    )
-    fig_g.update_layout(
-        height=620,
-        geo=dict(showframe=False, showcoastlines=True, projection_type='natural earth', bgcolor='rgba(0,0,0,0)'),
-        margin=dict(l=0, r=0, t=50, b=0)
-    )
-    st.plotly_chart(fig_g, use_container_width=True)
+    st.plotly_chart(metric_choropleth(country_data, unit=currency_name), use_container_width=True)
     st.markdown('<div class="data-source">数据来源: <a href="https://www.antom.com/cn/about-us/" target="_blank">Antom官方业务报告</a>, 2025年H1</div>', unsafe_allow_html=True)
 
 elif analysis_type == "交易平台渗透":
+    platform_penetration = get_dataset('platform_penetration', currency=display_currency)
     st.markdown('<div class="section-header">🧭 交易平台渗透与对比</div>', unsafe_allow_html=True)
     st.info("当前Antom已覆盖主要全球与区域电商/内容电商平台，以下展示各平台渗透率, 竞对分析以及发展建议。")
     with st.container():
@@ -318,9 +659,9 @@ elif analysis_type == "交易平台渗透":
                 marker_color=color,
                 customdata=custom,
                 hovertemplate=(
-                    f"%{{x}}<br>{name}: $%{{customdata[0]:.1f}}B"
+                    f"%{{x}}<br>{name}: {currency_symbol}%{{customdata[0]:.1f}}B"
                     f"<br>渗透率: %{{customdata[1]:.1%}}"
-                    f"<br>平台总GMV: $%{{customdata[2]:.1f}}B<extra></extra>"
+                    f"<br>平台总GMV: {currency_symbol}%{{customdata[2]:.1f}}B<extra></extra>"
                 )
             ), row=1, col=1)
 
@@ -345,7 +686,7 @@ elif analysis_type == "交易平台渗透":
             title='各平台渗透结构与总交易额（按交易额堆叠）',
             height=560,
             xaxis_tickangle=-30,
-            yaxis_title='总交易额（十亿美元）',
+            yaxis_title=f'总交易额（十亿{currency_name}）',
             legend_title_text='收单服务商',
             xaxis=dict(categoryorder='array', categoryarray=plot_df['platform'].tolist())
         )
@@ -377,27 +718,10 @@ elif analysis_type == "交易平台渗透":
                 align='center'
             )
         st.plotly_chart(fig1, use_container_width=True)
-        st.markdown('<div class="data-source">GMV为行业估算中位值（单位：十亿美元）；来源综合财报/招股书、权威媒体与机构数据库（区间口径略有差异，仅用于可视化演示）。数据时间：截至2024年全年，更新于2025-01。渗透率为演示用数据，非官方披露，仅用于面试展示。</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="data-source">GMV为行业估算中位值（单位：十亿{currency_name}）；来源综合财报/招股书、权威媒体与机构数据库（区间口径略有差异，仅用于可视化演示）。数据时间：截至2024年全年，更新于2025-01。渗透率为演示用数据，非官方披露，仅用于面试展示。</div>', unsafe_allow_html=True)
     # 竞对对照（融合表格）
     st.markdown("### 🧭 竞对对照与渗透建议")
-    suggestions_map = {
-        'Shopee/Lazada': '阿里系/东南亚：本地钱包与分期联动；新客90天加速包；内容电商失败重试+智能路由',
-        'Amazon/EU PSPs': '全球：切入长尾跨境卖家，多币种结算与稳定性；站外支付联名营销',
-        'Stripe/Adyen': '全球独立站：差异化费控+更优路由；联动风控阈值灰度提升转化',
-        'MercadoPago': '拉美：PIX/BOLETO/分期全量覆盖；税费字段与报关映射优化，缩短结算时延',
-        'Noon/Local PSPs': '中东：对接Tap/HyperPay补齐方式；伊斯兰金融合规与数据本地化优先',
-        'TikTok Shop/Temu': '内容/低客单：小额授权与批量对账优化；风控阈值AB，保转化与安全'
-    }
-    competitor_display = competitor_data.copy()
-    competitor_display['渗透建议'] = competitor_display['platform'].map(suggestions_map).fillna('按区域定制：方式矩阵+结算效率+风控转化三要素联动')
-    competitor_display = competitor_display.rename(columns={
-        'region': '区域',
-        'platform': '平台/场景',
-        'main_competitors': '主要竞对',
-        'antom_strength': 'Antom优势',
-        'antom_gap': 'Antom差距'
-    })
-    st.dataframe(competitor_display, use_container_width=True)
+    paginated_table('competitor_display', key='competitor')
     st.markdown('<div class="data-source">数据来源: 行业公开信息与平台观察（示例），2025年H1</div>', unsafe_allow_html=True)
 
 elif analysis_type == "竞对分析":
@@ -405,6 +729,7 @@ elif analysis_type == "竞对分析":
     pass
 
 elif analysis_type == "支付成功率分析":
+    payment_methods = get_dataset('payment_methods', currency=display_currency)
     st.markdown('<div class="section-header">💳 跨境收单支付成功率分析</div>', unsafe_allow_html=True)
     
     # 添加说明
@@ -486,6 +811,7 @@ elif analysis_type == "支付成功率分析":
     st.markdown('<div class="data-source">数据来源: <a href="https://www.antom.com/cn/about-us/" target="_blank">Antom交易数据</a>（示例），2025年H1</div>', unsafe_allow_html=True)
 
 elif analysis_type == "行业规模分析":
+    merchant_industries = get_dataset('merchant_industries', currency=display_currency)
     st.markdown('<div class="section-header">🏪 行业规模分析</div>', unsafe_allow_html=True)
     
     # 仅保留：商户数量 vs 平均交易金额（气泡大小=月交易量）
@@ -496,98 +822,26 @@ elif analysis_type == "行业规模分析":
         size='monthly_volume',
         color='industry',
         title='商户数量 vs 平均交易金额',
-        labels={'merchant_count': '商户数量', 'avg_transaction': '平均交易金额（美元）'}
+        labels={'merchant_count': '商户数量', 'avg_transaction': f'平均交易金额（{currency_name}）'}
     )
     fig2.update_layout(height=420)
     st.plotly_chart(fig2, use_container_width=True)
 
-    # 新增：行业强项·热力图（0-10，报告+演示补齐）
-    # 去掉“其他”，并概括为6个行业
-    covered_industries = [i for i in merchant_industries['industry'].tolist() if i != '其他']
-    potential_industries = ['体育用品', '家具家居', '汽车后市场', '宠物用品', '母婴用品']
-    industries_pool = covered_industries + [i for i in potential_industries if i not in covered_industries]
-    # 精选六个行业用于对比
-    industries_all = ['电商零售', '餐饮酒店', '旅游出行', '金融服务', '教育培训', '医疗健康']
-    providers = ['Antom', '主要竞对', '本地PSP', '银行转账网关']
-
-    # 生成评分矩阵：已覆盖行业 Antom 高（7-9），潜力行业 Antom 中低（3-6）；其他提供方相对分布
-    np.random.seed(42)
-    scores = []
-    for prov in providers:
-        row = []
-        for ind in industries_all:
-            base = 0
-            if prov == 'Antom':
-                base = 8 if ind in covered_industries else 4.5
-            elif prov == '主要竞对':
-                base = 6.5 if ind in covered_industries else 6.0
-            elif prov == '本地PSP':
-                base = 7.0 if ind in ['餐饮酒店','本地生活','教育培训','医疗健康','游戏娱乐'] else 5.5
-            else:  # 银行转账网关
-                base = 5.0
-            noise = np.random.uniform(-0.6, 0.6)
-            row.append(max(0, min(10, round(base + noise, 1))))
-        scores.append(row)
-
-    # 删除“行业强项·热力图”模块（按需求）
-
     # 行业×区域×服务商：并列热力图（y轴为服务商，含Antom）
     st.markdown("### 🧭 行业×区域×服务商：并列热力图（0-10）")
-    regions = ['亚太', '欧洲', '北美', '拉美', '中东非洲']
-    providers4 = ['Antom', 'Stripe', 'Adyen', '本地PSP']
-    industries_all = industries_all  # 复用上文行业顺序
-
-    # 区域偏置，保证区分度
-    def region_bias(r: str) -> float:
-        return {
-            '亚太': 0.5,
-            '欧洲': 0.2,
-            '北美': 0.3,
-            '拉美': 0.1,
-            '中东非洲': 0.0,
-        }.get(r, 0.0)
-
-    # 生成 Z: [服务商 × (行业×区域)]
-    z_matrix = []
-    texts = []
-    x_top_level = []    # 行业
-    x_second_level = [] # 区域
-    # 先准备x多级分类
-    for ind in industries_all:
-        for reg in regions:
-            x_top_level.append(ind)
-            x_second_level.append(reg)
-
-    for prov in providers4:
-        row_vals = []
-        row_text = []
-        for ind in industries_all:
-            for reg in regions:
-                if prov == 'Antom':
-                    base = 8 if ind in covered_industries else 5
-                elif prov == 'Stripe':
-                    base = 7 if reg in ['北美', '欧洲'] else 5.5
-                elif prov == 'Adyen':
-                    base = 7.5 if reg == '欧洲' else 6.0
-                else:  # 本地PSP
-                    base = 7.0 if ind in ['餐饮酒店','本地生活','教育培训','医疗健康','游戏娱乐'] else 5.5
-                val = max(0, min(10, round(base + region_bias(reg) + np.random.uniform(-0.5, 0.5), 1)))
-                row_vals.append(val)
-                row_text.append(str(val))
-        z_matrix.append(row_vals)
-        texts.append(row_text)
+    scores = get_dataset('industry_region_scores')
 
     fig_strip = go.Figure(data=go.Heatmap(
-        z=z_matrix,
-        x=[x_top_level, x_second_level],  # 多级分类：上层行业、下层区域
-        y=providers4,
+        z=scores['z'],
+        x=scores['x'],  # 多级分类：上层行业、下层区域
+        y=scores['y'],
         colorscale='Peach',
         colorbar=dict(title='评分')
     ))
 
     # 在格子内标注分数
     fig_strip.update_traces(
-        text=texts,
+        text=scores['text'],
         texttemplate='%{text}',
         textfont=dict(size=10, color='#333')
     )
@@ -605,6 +859,7 @@ elif analysis_type == "行业规模分析":
     st.plotly_chart(fig_strip, use_container_width=True)
 
 elif analysis_type == "风险与合规":
+    time_series_data = get_dataset('time_series_data')
     st.markdown('<div class="section-header">🛡️ 风险监控与合规分析</div>', unsafe_allow_html=True)
     
     # 风险指标
@@ -686,6 +941,7 @@ elif analysis_type == "风险与合规":
     st.markdown('<div class="data-source">数据来源: <a href="https://www.antom.com/cn/about-us/" target="_blank">Antom风控系统</a>, 2023-2025H1; 安全监控报告（示例）</div>', unsafe_allow_html=True)
 
 elif analysis_type == "业务预测":
+    time_series_data = get_dataset('time_series_data')
     st.markdown('<div class="section-header">🔮 业务预测与趋势分析</div>', unsafe_allow_html=True)
     
     # 预测模型结果
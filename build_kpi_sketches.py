@@ -0,0 +1,79 @@
+"""KPI 草图离线构建任务
+
+读取原始明细日志，按 (日期, 区域) 写入 HyperLogLog / KLL 草图，输出到看板读取的
+data/kpi_sketches.json。日志为 CSV（分块读取）或 Parquet，需包含以下列：
+
+    date            交易时间或日期
+    region          区域
+    merchant_id     商户ID
+    consumer_id     消费者ID
+    response_time_s 响应时间（秒）
+
+用法:
+    # 全量重建
+    python build_kpi_sketches.py logs/2025-*.csv
+    # 每日增量：只传入当天新增的日志
+    python build_kpi_sketches.py --append logs/2025-07-01.csv
+"""
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from sketches import SketchStore
+
+KPI_SKETCH_PATH = Path(__file__).parent / 'data' / 'kpi_sketches.json'
+LOG_COLUMNS = ['date', 'region', 'merchant_id', 'consumer_id', 'response_time_s']
+
+
+# ID 列一律按原文读取：避免某块含空值时整列变成 float64，也保留前导零
+ID_DTYPES = {'merchant_id': str, 'consumer_id': str}
+
+
+def _read_log(path, chunksize):
+    """逐块读取日志，Parquet 整文件读取"""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        yield pd.read_parquet(path, columns=LOG_COLUMNS)
+    else:
+        yield from pd.read_csv(path, usecols=LOG_COLUMNS, dtype=ID_DTYPES, chunksize=chunksize, encoding='utf-8-sig')
+
+
+def build_kpi_sketches(paths, output=KPI_SKETCH_PATH, append=False, chunksize=1_000_000, precision=14, k=200):
+    """把日志写入草图并保存；append=True 时在已有草图上追加
+
+    去重计数重复写入不影响结果，但响应时间分位数会重复计数，
+    因此追加模式只应传入尚未写入过的日志。
+    """
+    output = Path(output)
+    store = SketchStore.load(output) if append and output.exists() else SketchStore(precision, k)
+    rows = 0
+    for path in paths:
+        for chunk in _read_log(path, chunksize):
+            day = pd.to_datetime(chunk['date']).dt.normalize()
+            for (d, region), group in chunk.groupby([day, 'region'], sort=False):
+                store.update(
+                    d, region,
+                    # 缺失的ID不计入去重数；两列各自剔除，不影响同一行的另一列
+                    merchant_ids=group['merchant_id'].dropna(),
+                    consumer_ids=group['consumer_id'].dropna(),
+                    response_times=group['response_time_s'].to_numpy()
+                )
+            rows += len(chunk)
+    store.save(output)
+    print(f"写入 {rows:,} 行日志，共 {len(store.days())} 天 × {len(store.regions())} 个区域 -> {output}")
+    return store
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="由原始日志构建 KPI 草图")
+    parser.add_argument('paths', nargs='+', help="日志文件（CSV 或 Parquet）")
+    parser.add_argument('--output', default=str(KPI_SKETCH_PATH), help="草图输出路径")
+    parser.add_argument('--append', action='store_true', help="在已有草图上追加（仅传入新增日志）")
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help="CSV 分块行数")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    build_kpi_sketches(args.paths, args.output, append=args.append, chunksize=args.chunksize)
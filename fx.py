@@ -0,0 +1,70 @@
+"""多币种归一化
+
+汇率表为 (date, currency, usd_per_unit) 的日频数据，表示该日 1 单位本币折合多少美元。
+
+- to_base_currency: 原始交易按 (币种, 日期) 做 as-of 匹配（取不晚于交易日的最近汇率），
+  向量化地把金额换算为美元
+- from_base_currency: 把美元口径的汇总表换算为展示币种，用于看板切换币种
+"""
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCY = 'USD'
+
+
+def load_fx_rates(path):
+    """读取汇率表，按日期排序"""
+    rates = pd.read_csv(path, encoding='utf-8-sig', usecols=['date', 'currency', 'usd_per_unit'])
+    rates['date'] = pd.to_datetime(rates['date'])
+    return rates.sort_values('date', kind='mergesort').reset_index(drop=True)
+
+
+def to_base_currency(df, rates, amount_cols, date_col='date', currency_col='currency', tolerance=None):
+    """把 amount_cols 按交易日汇率换算为美元，返回新表（行顺序不变）
+
+    tolerance 为可接受的汇率最大滞后（如 pd.Timedelta('7D')），超出视为缺失汇率。
+    """
+    # 两侧日期统一到纳秒精度，否则 merge_asof 会因 datetime64 单位不同（ns / us）报错
+    left = df[[date_col, currency_col]].copy()
+    left[date_col] = pd.to_datetime(left[date_col]).dt.as_unit('ns')
+    left['_row'] = np.arange(len(df))
+    right = rates[['date', 'currency', 'usd_per_unit']].rename(columns={'date': date_col, 'currency': currency_col})
+    right[date_col] = pd.to_datetime(right[date_col]).dt.as_unit('ns')
+    matched = pd.merge_asof(
+        left.sort_values(date_col, kind='mergesort'),
+        right,
+        on=date_col,
+        by=currency_col,
+        direction='backward',
+        tolerance=tolerance
+    ).sort_values('_row')
+
+    rate = matched['usd_per_unit'].to_numpy(dtype=float, copy=True)
+    rate[(matched[currency_col] == BASE_CURRENCY).to_numpy()] = 1.0
+    missing = np.isnan(rate)
+    if missing.any():
+        currencies = sorted(matched.loc[missing, currency_col].astype(str).unique())
+        raise ValueError(f"缺少以下币种在交易日之前的汇率: {', '.join(currencies)}")
+
+    out = df.copy()
+    out[amount_cols] = out[amount_cols].to_numpy(dtype=float) * rate[:, None]
+    out[currency_col] = BASE_CURRENCY
+    return out
+
+
+def rate_as_of(rates, currency, as_of):
+    """某币种在 as_of 当日或之前最近一次的汇率（1 单位本币折合美元）"""
+    if currency == BASE_CURRENCY:
+        return 1.0
+    history = rates[(rates['currency'] == currency) & (rates['date'] <= pd.Timestamp(as_of))]
+    if history.empty:
+        raise ValueError(f"缺少 {currency} 在 {as_of} 之前的汇率")
+    return float(history['usd_per_unit'].iloc[-1])
+
+
+def from_base_currency(df, amount_cols, currency, rates, as_of):
+    """把美元口径的 amount_cols 按 as_of 汇率换算为 currency，返回新表"""
+    out = df.copy()
+    if currency != BASE_CURRENCY:
+        out[amount_cols] = out[amount_cols] / rate_as_of(rates, currency, as_of)
+    return out
@@ -0,0 +1,248 @@
+"""Antom 看板并发压测工具
+
+通过 Streamlit 的 WebSocket 协议（/_stcore/stream，二进制 protobuf）模拟 N 个并发浏览器会话：
+每个会话在侧边栏的分析类型之间随机切换，两次切换之间按指数分布的思考时间停顿，
+统计每次重跑从发出 rerun 到收到 script_finished 的耗时（服务端完成渲染的时间），
+并输出 p50/p95/p99、超时率、吞吐量以及服务端进程的 CPU / RSS。
+超时的渲染按超时值计入耗时，随后重建会话（回到首屏）继续，直到压测结束。
+
+用法:
+    streamlit run app.py --server.headless true &
+    python loadtest.py --sessions 20 --duration 120 --server-pid $!
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+try:
+    import psutil
+except ImportError:  # 未安装时不采集服务端资源
+    psutil = None
+
+PAGE_SELECTBOX_LABEL = "选择分析类型"
+COLD_START = '首屏'
+
+
+def stream_url(base_url):
+    """http(s)://host:port[/base] -> ws(s)://host:port[/base]/_stcore/stream"""
+    parsed = urlparse(base_url)
+    scheme = 'wss' if parsed.scheme == 'https' else 'ws'
+    return f"{scheme}://{parsed.netloc}{parsed.path.rstrip('/')}/_stcore/stream"
+
+
+class BrowserSession:
+    """一个模拟的浏览器会话：负责连接、发送 rerun 并等待本次渲染结束"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.selectbox = None  # 分析类型下拉框的 proto，首屏渲染时发现
+
+    async def connect(self):
+        # 首个子协议用于协商，其余位置（XSRF token、会话ID）留空
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            ws, self.ws, self.selectbox = self.ws, None, None
+            await ws.close()
+
+    async def rerun(self, page=None):
+        """发出一次 rerun（可选切换页面），返回服务端渲染耗时（秒）"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        if page is not None:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = self.selectbox.id
+            # 1.45 起 selectbox 以选项文本回传，此前以选项下标回传
+            if 'accept_new_options' in self.selectbox.DESCRIPTOR.fields_by_name:
+                state.string_value = page
+            else:
+                state.int_value = list(self.selectbox.options).index(page)
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        await asyncio.wait_for(self._wait_finished(), self.timeout)
+        return time.perf_counter() - started
+
+    async def _wait_finished(self):
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof('type')
+            if kind == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                element = fwd.delta.new_element
+                if element.WhichOneof('type') == 'selectbox' and element.selectbox.label == PAGE_SELECTBOX_LABEL:
+                    self.selectbox = element.selectbox
+                elif element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(f"脚本异常: {element.exception.message}")
+            elif kind == 'script_finished':
+                if fwd.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                    return
+                if fwd.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("脚本编译失败")
+
+
+class Recorder:
+    """汇总各会话的渲染耗时、超时与失败次数"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def add(self, page, seconds):
+        self.latencies[page].append(seconds)
+
+    def timeout(self, page, seconds):
+        """超时的渲染按超时值计入耗时，避免分位数只统计幸存的请求"""
+        self.latencies[page].append(seconds)
+        self.timeouts[page] += 1
+
+    def fail(self, reason):
+        self.errors[reason] += 1
+
+
+async def run_session(index, args, recorder, deadline):
+    # 在 ramp-up 时间内均匀错开会话启动
+    await asyncio.sleep(args.ramp_up * index / max(args.sessions, 1))
+    rng = random.Random(args.seed + index)
+    session = BrowserSession(stream_url(args.url), args.timeout)
+    pages = current = None
+    try:
+        while time.perf_counter() < deadline:
+            if session.ws is None:
+                # 新建或重建会话：首屏渲染回到下拉框默认选项
+                page = None
+            else:
+                await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+                if time.perf_counter() >= deadline:
+                    return
+                page = rng.choice([p for p in pages if p != current] or pages)
+            label = COLD_START if page is None else page
+            try:
+                if session.ws is None:
+                    await asyncio.wait_for(session.connect(), args.timeout)
+                recorder.add(label, await session.rerun(page))
+            except asyncio.TimeoutError:
+                # 首屏与切换共用同一重试路径：计入超时后重建会话，直到压测结束
+                recorder.timeout(label, args.timeout)
+                await session.close()
+                continue
+            except (websockets.ConnectionClosed, OSError) as exc:
+                recorder.fail(type(exc).__name__)
+                await session.close()
+                await asyncio.sleep(min(1.0, args.timeout))
+                continue
+            if page is None:
+                if session.selectbox is None:
+                    raise RuntimeError(f"未找到“{PAGE_SELECTBOX_LABEL}”下拉框")
+                pages = list(session.selectbox.options)
+                current = pages[0]  # 首屏为下拉框默认选项
+            else:
+                current = page
+    except Exception as exc:
+        recorder.fail(type(exc).__name__)
+        if args.verbose:
+            print(f"[session {index}] {exc!r}")
+    finally:
+        await session.close()
+
+
+async def sample_process(pid, interval, samples, stop):
+    """按固定间隔采样服务端进程（含子进程）的 CPU% 与 RSS"""
+    proc = psutil.Process(pid)
+    procs = [proc] + proc.children(recursive=True)
+    for p in procs:
+        p.cpu_percent(None)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        cpu = rss = 0.0
+        for p in procs:
+            try:
+                cpu += p.cpu_percent(None)
+                rss += p.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+        samples.append((cpu, rss))
+
+
+def report(recorder, elapsed, samples):
+    # 首屏（新会话冷启动）单独成行，不计入“全部”与吞吐量，以免拉高页面切换的分位数
+    switches = [np.asarray(v) for page, v in recorder.latencies.items() if page != COLD_START]
+    all_latencies = np.concatenate(switches) if switches else np.empty(0)
+    print(f"\n页面切换渲染 {all_latencies.size} 次，耗时 {elapsed:.1f}s，吞吐量 {all_latencies.size / elapsed:.2f} 次/秒")
+    if recorder.errors:
+        print("失败: " + ", ".join(f"{k}={v}" for k, v in sorted(recorder.errors.items())))
+
+    # 超时的渲染已按超时值计入分位数，超时率单列
+    pages = sorted(page for page in recorder.latencies if page != COLD_START)
+    switch_timeouts = sum(n for page, n in recorder.timeouts.items() if page != COLD_START)
+    rows = [('全部', all_latencies, switch_timeouts)]
+    rows += [(page, np.asarray(recorder.latencies[page]), recorder.timeouts[page]) for page in pages]
+    rows.append((COLD_START, np.asarray(recorder.latencies.get(COLD_START, [])), recorder.timeouts[COLD_START]))
+    print(f"\n{'页面':<12}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'超时率':>8}")
+    for page, values, timeouts in rows:
+        if values.size == 0:
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        print(f"{page:<12}{values.size:>8}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{values.max() * 1000:>10.0f}"
+              f"{timeouts / values.size:>8.1%}")
+
+    if samples:
+        cpu, rss = np.asarray(samples).T
+        print(f"\n服务端 CPU: 平均 {cpu.mean():.0f}%，峰值 {cpu.max():.0f}%；RSS: 峰值 {rss.max() / 2**20:.0f} MiB")
+
+
+async def main(args):
+    recorder = Recorder()
+    samples = []
+    stop = asyncio.Event()
+    sampler = None
+    if args.server_pid:
+        if psutil is None:
+            print("⚠️ 未安装 psutil，跳过服务端 CPU/RSS 采集（pip install psutil）")
+        else:
+            sampler = asyncio.create_task(sample_process(args.server_pid, args.sample_interval, samples, stop))
+
+    started = time.perf_counter()
+    deadline = started + args.ramp_up + args.duration
+    await asyncio.gather(*(run_session(i, args, recorder, deadline) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    if sampler is not None:
+        await sampler
+    report(recorder, elapsed, samples)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="模拟并发浏览器会话压测 Streamlit 看板")
+    parser.add_argument('--url', default='http://localhost:8501', help="看板地址")
+    parser.add_argument('--sessions', type=int, default=10, help="并发会话数")
+    parser.add_argument('--duration', type=float, default=60, help="全部会话启动后的持续时间（秒）")
+    parser.add_argument('--ramp-up', type=float, default=10, help="会话逐个启动所用时间（秒）")
+    parser.add_argument('--think-time', type=float, default=5, help="两次切换页面之间的平均思考时间（秒）")
+    parser.add_argument('--timeout', type=float, default=60, help="单次渲染超时（秒），超时后重建会话并按超时值计入耗时")
+    parser.add_argument('--server-pid', type=int, help="Streamlit 进程 PID，用于采集 CPU/RSS（需要 psutil）")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="CPU/RSS 采样间隔（秒）")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--verbose', action='store_true', help="打印会话级错误")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
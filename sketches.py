@@ -0,0 +1,302 @@
+"""可合并的近似统计草图（sketch），用于 KPI 卡片
+
+- HyperLogLog: 近似去重计数（商户数、消费者数）
+- KLLSketch: 近似分位数（响应时间 p50/p95/p99）
+- SketchStore: 按 (日期, 区域) 维护草图，查询时按需合并
+
+草图大小与原始日志行数无关，跨天、跨区域合并只需逐元素运算，
+因此 KPI 可以在有界内存下秒级刷新。
+"""
+import base64
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+def _mix64(x):
+    """splitmix64 终混函数，把 uint64 打散为均匀分布的哈希值"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# 可无损转为 int64 的十进制整数字符串（不含前导零，前导零ID按字符串处理）
+_INT_PATTERN = r'-?(?:0|[1-9][0-9]{0,17})'
+
+
+def _canonical(value):
+    """混合类型的单个取值转为规范字符串：整数值浮点去掉小数部分"""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _hash64(values):
+    """将取值向量化地哈希为 uint64（调用方需先剔除空值）
+
+    同一ID无论以整数、整数值浮点还是十进制字符串出现，都按整数值混合，
+    因此哈希结果与列的 dtype 无关；其余浮点按二进制位混合，其余字符串交给 pandas 哈希。
+    """
+    # 经 Series 推断类型，避免 np.asarray 把 [1, '1'] 之类的混合列表统一转成字符串
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    kind = values.dtype.kind
+    if kind in 'biu':
+        return _mix64(values.to_numpy().astype(np.int64).view(np.uint64))
+    if kind == 'f':
+        floats = values.to_numpy(dtype=np.float64)
+        hashes = _mix64(floats.view(np.uint64))
+        integral = (floats == np.floor(floats)) & (np.abs(floats) < 2.0 ** 63)
+        hashes[integral] = _mix64(floats[integral].astype(np.int64).view(np.uint64))
+        return hashes
+    strings = values.astype(object)
+    if pd.api.types.infer_dtype(strings, skipna=False) != 'string':
+        strings = strings.map(_canonical)
+    integral = strings.str.fullmatch(_INT_PATTERN).to_numpy(dtype=bool)
+    hashes = np.empty(len(strings), dtype=np.uint64)
+    hashes[integral] = _mix64(strings[integral].astype(np.int64).to_numpy().view(np.uint64))
+    hashes[~integral] = pd.util.hash_array(strings[~integral].to_numpy(dtype=object))
+    return hashes
+
+
+def _bit_length(x):
+    """uint64 数组逐元素的有效位数"""
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    n += (x > 0).astype(np.uint8)
+    return n
+
+
+class HyperLogLog:
+    """HyperLogLog 去重计数，相对误差约为 1.04 / sqrt(2 ** precision)"""
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision 需在 4-18 之间")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """批量加入取值（可重复），空值忽略"""
+        values = values if isinstance(values, pd.Series) else pd.Series(values)
+        values = values[values.notna()]
+        if len(values) == 0:
+            return self
+        hashes = _hash64(values)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        rank = np.minimum(64 - _bit_length(rest).astype(np.int16) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """原地合并另一个同精度草图"""
+        if other.precision != self.precision:
+            raise ValueError("只能合并相同 precision 的 HyperLogLog")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """估计去重后的元素个数"""
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时改用线性计数
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def copy(self):
+        clone = HyperLogLog(self.precision)
+        clone.registers = self.registers.copy()
+        return clone
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        sketch = cls(payload['precision'])
+        sketch.registers = np.frombuffer(base64.b64decode(payload['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+class KLLSketch:
+    """KLL 分位数草图，第 h 层的每个元素代表 2 ** h 个原始样本"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.compactors = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while True:
+            level = next((h for h, items in enumerate(self.compactors) if items.size > self._capacity(h)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.compactors):
+                self.compactors.append(np.empty(0))
+            items = np.sort(self.compactors[level])
+            # 奇数个时保留最后一个，其余随机取奇/偶位晋升到上一层
+            keep = items[-1:] if items.size % 2 else items[:0]
+            paired = items[:items.size - keep.size]
+            promoted = paired[self._rng.integers(2)::2]
+            self.compactors[level] = keep
+            self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+
+    def update(self, values):
+        """批量加入样本"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        # 按 k 分块写入，避免一次性整批压缩导致保留的样本过少
+        for start in range(0, values.size, self.k):
+            chunk = values[start:start + self.k]
+            self.compactors[0] = np.concatenate([self.compactors[0], chunk])
+            self.count += chunk.size
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """原地合并另一个草图"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """估计一组分位数（qs 取值 0-1）；草图为空时返回 NaN"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(c.size, 2.0 ** h) for h, c in enumerate(self.compactors)])
+        order = np.argsort(items, kind='mergesort')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        return items[np.minimum(positions, items.size - 1)]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def copy(self):
+        clone = KLLSketch(self.k)
+        clone.count = self.count
+        clone.compactors = [items.copy() for items in self.compactors]
+        return clone
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'compactors': [items.tolist() for items in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, payload):
+        sketch = cls(payload['k'])
+        sketch.count = payload['count']
+        sketch.compactors = [np.asarray(items, dtype=float) for items in payload['compactors']]
+        return sketch
+
+
+class SketchStore:
+    """按 (日期, 区域) 维护的 KPI 草图集合
+
+    每个单元格包含 merchants / consumers 两个 HyperLogLog 与 response_time 一个 KLLSketch；
+    日志按天增量写入，查询时再按日期区间与区域合并。
+    """
+
+    def __init__(self, precision=14, k=200):
+        self.precision = precision
+        self.k = k
+        self.cells = {}
+
+    def _cell(self, day, region):
+        key = (pd.Timestamp(day).date(), region)
+        if key not in self.cells:
+            self.cells[key] = {
+                'merchants': HyperLogLog(self.precision),
+                'consumers': HyperLogLog(self.precision),
+                'response_time': KLLSketch(self.k)
+            }
+        return self.cells[key]
+
+    def update(self, day, region, merchant_ids=(), consumer_ids=(), response_times=()):
+        """写入某天某区域的一批原始日志"""
+        cell = self._cell(day, region)
+        cell['merchants'].update(merchant_ids)
+        cell['consumers'].update(consumer_ids)
+        cell['response_time'].update(response_times)
+        return self
+
+    def days(self):
+        return sorted({day for day, _ in self.cells})
+
+    def regions(self):
+        return sorted({region for _, region in self.cells})
+
+    def merged(self, start=None, end=None, regions=None, names=None):
+        """合并日期区间 [start, end] 内、指定区域（默认全部）的草图
+
+        names 限定只合并其中几种草图（如只取去重计数时跳过 response_time），默认全部。
+        """
+        start = pd.Timestamp(start).date() if start is not None else date.min
+        end = pd.Timestamp(end).date() if end is not None else date.max
+        result = {
+            'merchants': HyperLogLog(self.precision),
+            'consumers': HyperLogLog(self.precision),
+            'response_time': KLLSketch(self.k)
+        }
+        if names is not None:
+            result = {name: result[name] for name in names}
+        for (day, region), cell in self.cells.items():
+            if start <= day <= end and (regions is None or region in regions):
+                for name, sketch in result.items():
+                    sketch.merge(cell[name])
+        return result
+
+    def save(self, path):
+        payload = {
+            'precision': self.precision,
+            'k': self.k,
+            'cells': [
+                {
+                    'day': day.isoformat(),
+                    'region': region,
+                    'merchants': cell['merchants'].to_dict(),
+                    'consumers': cell['consumers'].to_dict(),
+                    'response_time': cell['response_time'].to_dict()
+                }
+                for (day, region), cell in sorted(self.cells.items())
+            ]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        store = cls(payload['precision'], payload['k'])
+        for item in payload['cells']:
+            store.cells[(date.fromisoformat(item['day']), item['region'])] = {
+                'merchants': HyperLogLog.from_dict(item['merchants']),
+                'consumers': HyperLogLog.from_dict(item['consumers']),
+                'response_time': KLLSketch.from_dict(item['response_time'])
+            }
+        return store
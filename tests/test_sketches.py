@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from build_kpi_sketches import build_kpi_sketches
+from sketches import HyperLogLog, SketchStore, _hash64
+
+
+def test_hash_is_independent_of_id_dtype():
+    ids = np.arange(1, 1001)
+    expected = _hash64(ids)
+    assert (_hash64(ids.astype(float)) == expected).all()
+    assert (_hash64(ids.astype(str)) == expected).all()
+    assert (_hash64(pd.Series(ids, dtype=object)) == expected).all()
+
+
+def test_int_float_and_str_ids_merge_to_one_count():
+    ids = np.arange(5000)
+    sketch = HyperLogLog().update(ids).update(ids.astype(float)).update(ids.astype(str))
+    assert sketch.count() == HyperLogLog().update(ids).count()
+
+
+def test_nulls_and_leading_zeros():
+    sketch = HyperLogLog().update(pd.Series(['007', '7', None, np.nan]))
+    assert sketch.count() == 2
+
+
+def test_blank_id_in_one_chunk_does_not_change_count(tmp_path):
+    log = pd.DataFrame({
+        'date': '2025-06-30',
+        'region': '亚太',
+        'merchant_id': np.arange(20000) % 500,
+        'consumer_id': np.arange(20000).astype(object),
+        'response_time_s': 0.2,
+    })
+    log.loc[15000, 'consumer_id'] = None
+    path = tmp_path / 'log.csv'
+    log.to_csv(path, index=False)
+
+    store = build_kpi_sketches([path], output=tmp_path / 'sketches.json', chunksize=10000)
+    exact = HyperLogLog().update(np.delete(np.arange(20000), 15000))
+    total = store.merged(names=['merchants', 'consumers'])
+    assert set(total) == {'merchants', 'consumers'}
+    assert total['consumers'].count() == exact.count()
+    assert total['merchants'].count() == HyperLogLog().update(np.arange(500)).count()
+    assert isinstance(SketchStore.load(tmp_path / 'sketches.json'), SketchStore)